@@ -0,0 +1,11 @@
+import os
+
+# `gunicorn app:app` 実行時に自動で読み込まれる設定
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+keepalive = 75
+
+# MCPサブプロセスとイベントループスレッドはforkを跨げないため、ワーカーごとにアプリを読み込む
+preload_app = False
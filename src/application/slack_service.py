@@ -1,230 +1,448 @@
 import threading
 import re
 import json
+import logging
+import time
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from src.infrastructure.logger import setup_logger
 from markdown2slack.app import Convert
 
+HANDLED_EVENT_TYPES = ("app_mention", "message")
+
+# メンションタグ / 表示テキスト付きURLタグ / URLタグを一度の走査で処理する
+_SLACK_FORMAT_RE = re.compile(r'<@[A-Z0-9]+>|<(https?://[^|>]+)\|([^>]+)>|<(https?://[^>]+)>')
+
+def _replace_slack_format(match):
+    """マッチしたタグをプレーンテキストに置き換える"""
+    url, label, bare_url = match.groups()
+    if url:
+        # <https://example.com|表示テキスト> → https://example.com (表示テキスト)
+        return f"{url} ({label})"
+    # <https://example.com> → https://example.com、メンションタグは削除
+    return bare_url or ''
+
+# 変換器は状態を持たないため、プロセス内の全サービスで共有する
+_CONVERTER = Convert()
+
+@functools.lru_cache(maxsize=512)
+def _to_slack_format(text):
+    """MarkdownをSlack形式に変換（同一テキストの変換結果をサービス間で再利用）"""
+    return _CONVERTER.markdown_to_slack_format(text)
+
+# 送信のたびに組み立て直さないよう固定のブロックはモジュールレベルで保持する（変更しないこと）
+_LOADING_TEXT = "処理中です..."
+_LOADING_BLOCKS = [
+    {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": ":hourglass_flowing_sand: *処理中です...*"
+        }
+    }
+]
+# ユーザー表示名のキャッシュ設定
+_USER_CACHE_MAX = 512
+_USER_CACHE_TTL = 600
+
+# 整形済みメッセージテキストのキャッシュ上限（元テキストと整形後テキストの合計文字数）
+_CLEAN_CACHE_MAX_CHARS = 1_000_000
+
+# 単一DMで応答がこの秒数内に揃えばローディングメッセージを送信しない
+_LOADING_GRACE_PERIOD = 1.0
+
+_ERROR_BLOCK_TEXT = ":x: *エラーが発生しました*\n```{}```"
+_EMPTY_RESPONSE_TEXT = "（応答を生成できませんでした）"
+
 class SlackService:
     """Slackイベント処理のビジネスロジック"""
     
-    def __init__(self, slack_client, bedrock_client, event_retention_period=3600, logger=None):
+    def __init__(self, slack_client, bedrock_client, event_retention_period=3600, logger=None, max_workers=16,
+                 max_processed_events=1024, bot_user_id=None):
         """SlackServiceの初期化"""
         self.slack_client = slack_client
         self.bedrock_client = bedrock_client
         self.event_retention_period = event_retention_period
         self.logger = logger or setup_logger(__name__)
-        self.processed_events = set()
-        self.converter = Convert()
+        # event_id -> 記録時刻（古い順）
+        self.processed_events = OrderedDict()
+        self.max_processed_events = max_processed_events
+        # 応答生成中のevent_id（キャッシュから押し出されても再処理しないため別に保持する）
+        self._in_flight = set()
+        self._events_lock = threading.Lock()
+        # user_id -> (表示名, 有効期限)
+        self._user_cache = OrderedDict()
+        self._user_cache_lock = threading.Lock()
+        # (ts, 元テキスト) -> 整形済みテキスト
+        self._clean_cache = OrderedDict()
+        self._clean_cache_chars = 0
+        self._clean_cache_lock = threading.Lock()
+        # 自身へのメンションは正規表現を使わずに除去する
+        self._bot_mention = f"<@{bot_user_id}>" if bot_user_id else None
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="slack-event")
+        # ローディングメッセージ送信・ユーザー情報取得等のSlack API呼び出し用（イベント処理スレッドから投入するため別プールにする）
+        self.io_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="slack-io")
         self.logger.info("SlackService initialized with InlineAgent")
     
     def handle_event(self, event_data):
         """Slackイベントを処理"""
         try:
             event_id = event_data.get("event_id")
+            event = event_data.get("event", {})
             
-            if event_id in self.processed_events:
-                self.logger.info(f"Duplicate event detected: {event_id}")
+            # 処理対象外のイベントは重複管理に登録する前に除外
+            if "bot_id" in event or event.get("subtype") == "bot_message":
+                self.logger.info("Ignoring bot message: %s", event.get('bot_id'))
                 return True
             
-            self.processed_events.add(event_id)
-            
-            if len(self.processed_events) > 1000:
-                self.logger.info("Clearing processed events cache (size > 1000)")
-                self.processed_events.clear()
-            
-            event = event_data.get("event", {})
+            if event.get("type") not in HANDLED_EVENT_TYPES:
+                self.logger.debug("Ignoring unsupported event type: %s", event.get('type'))
+                return True
             
-            if "bot_id" in event:
-                self.logger.info(f"Ignoring bot message: {event.get('bot_id')}")
+            if self._is_duplicate_event(event_id):
+                self.logger.info("Duplicate event detected: %s", event_id)
                 return True
             
-            # スレッドを使用せず、直接イベントを処理
-            self._dispatch_event(event)
+            # Slackの3秒制限内に応答するため、ワーカースレッドで処理
+            try:
+                self.executor.submit(self._process_event, event_id, event)
+            except Exception:
+                # 投入できなかったイベントは再送時に処理できるよう処理中の記録を解除する
+                with self._events_lock:
+                    self._in_flight.discard(event_id)
+                    self.processed_events.pop(event_id, None)
+                raise
             return True
             
         except Exception as e:
             self.logger.error(f"Error handling event: {e}", exc_info=True)
             return False
     
+    def _is_duplicate_event(self, event_id):
+        """処理済みイベントか判定し、未処理であれば記録する"""
+        now = time.monotonic()
+        with self._events_lock:
+            if event_id in self._in_flight:
+                return True
+            
+            if event_id in self.processed_events:
+                self.processed_events[event_id] = now
+                self.processed_events.move_to_end(event_id)
+                return True
+            
+            self.processed_events[event_id] = now
+            self._in_flight.add(event_id)
+            
+            # 上限超過分と保持期間切れのイベントを古い順に削除
+            while self.processed_events and (
+                len(self.processed_events) > self.max_processed_events
+                or now - next(iter(self.processed_events.values())) > self.event_retention_period
+            ):
+                self.processed_events.popitem(last=False)
+            return False
+    
+    def _process_event(self, event_id, event):
+        """イベントを処理し、完了後に処理中の記録を解除"""
+        try:
+            self._dispatch_event(event)
+        finally:
+            with self._events_lock:
+                self._in_flight.discard(event_id)
+    
+    def close(self):
+        """ワーカースレッドを停止"""
+        self.executor.shutdown(wait=False)
+        self.io_executor.shutdown(wait=False)
+    
     def _dispatch_event(self, event):
         """イベントタイプに基づいて適切なハンドラに振り分け"""
         try:
-            event_type = event.get("type")
-            channel = event.get("channel")
+            get = event.get
+            event_type = get("type")
+            channel = get("channel")
+            parent_ts = get("thread_ts")
             
-            self.logger.info(f"Processing event type: {event_type} in channel: {channel}")
+            self.logger.info("Processing event type: %s in channel: %s", event_type, channel)
             
             # スレッドのタイムスタンプを取得（直接またはペアレントから）
-            thread_ts = event.get("thread_ts") or event.get("ts")
+            thread_ts = parent_ts or get("ts")
             
             if event_type == "app_mention":
-                self._handle_mention(channel, thread_ts)
-            elif event_type == "message" and event.get("channel_type") == "im":
-                self._handle_direct_message(channel, thread_ts, event.get("thread_ts") is None)
+                self._handle_mention(channel, thread_ts, event)
+            elif event_type == "message" and get("channel_type") == "im":
+                self._handle_direct_message(channel, thread_ts, parent_ts is None, event)
         
         except Exception as e:
             self.logger.error(f"Error processing event: {e}", exc_info=True)
     
-    def _handle_mention(self, channel, thread_ts):
+    def _handle_mention(self, channel, thread_ts, event=None):
         """メンションイベントを処理"""
+        loading_future = None
         try:
-            # スレッドメッセージを取得
-            thread_messages = self.slack_client.get_thread_messages(channel, thread_ts)
+            # スレッド外のメンションはイベント自体が唯一のメッセージなのでAPIで取得し直さない
+            if event is not None and event.get("thread_ts") is None:
+                thread_messages = [event]
+            else:
+                thread_messages = self.slack_client.get_thread_messages(channel, thread_ts)
+            
+            # ローディングメッセージが取得結果に混ざらないよう、スレッド取得後に送信して応答生成と並行させる
+            loading_future = self._start_loading_message(channel, thread_ts)
             
             # メンションタグを削除
             cleaned_messages = self._clean_messages(thread_messages)
             
             self.logger.info("Generating response using Bedrock with InlineAgent")
             # クリーニングしたメッセージを直接BedrockClientに渡す
-            self.logger.debug(f"BedrockClientに渡すメッセージ(メンション): {json.dumps(cleaned_messages, ensure_ascii=False, indent=2)}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("BedrockClientに渡すメッセージ(メンション): %s", json.dumps(cleaned_messages, ensure_ascii=False))
             response = self.bedrock_client.generate_response(cleaned_messages)
             
             # 共通の応答処理メソッドを使用
-            self._process_response(channel, thread_ts, response)
+            self._process_response(channel, thread_ts, response, loading_future)
         except Exception as e:
             self.logger.error(f"Error in _handle_mention: {e}", exc_info=True)
+            self._show_loading_error(channel, loading_future, e)
     
-    def _handle_direct_message(self, channel, thread_ts, is_single_message):
+    def _handle_direct_message(self, channel, thread_ts, is_single_message, event=None):
         """ダイレクトメッセージイベントを処理"""
+        loading_future = None
         try:
             # 処理実行
             if is_single_message:
                 self.logger.debug("Processing single DM message")
-                # スレッドタイムスタンプではなく、メッセージを取得する必要がある
-                messages = self.slack_client.get_thread_messages(channel, thread_ts)
+                # イベントがあればそれ自体が対象メッセージなのでAPIで取得し直さない
+                if event is not None:
+                    messages = [event]
+                else:
+                    messages = self.slack_client.get_thread_messages(channel, thread_ts)
                 if messages and len(messages) > 0:
-                    message = messages[0]  # 最初のメッセージを取得
-                    
-                    # 通常のテキストを処理
-                    text = message.get("text", "")
-                    clean_text = self._process_slack_formatting(text)
+                    # ローディングメッセージは猶予時間を置いて並行送信し、それまでに応答が揃えば送信しない
+                    response_ready = threading.Event()
+                    loading_future = self._start_loading_message(channel, thread_ts, response_ready)
                     
-                    # blocksフィールドから追加情報を抽出
-                    blocks_text = self._extract_text_from_blocks(message.get("blocks", []))
-                    if blocks_text:
-                        self.logger.debug(f"単一DMのblocksから抽出したテキスト: {blocks_text}")
-                        if clean_text:
-                            clean_text = f"{clean_text}\n\n{blocks_text}"
-                        else:
-                            clean_text = blocks_text
+                    message = messages[0]  # 最初のメッセージを取得
+                    clean_text = self._build_message_text(message)
                     
                     # ユーザー名情報を追加
                     user_id = message.get("user")
                     if user_id:
-                        user_info = self.slack_client.get_user_info(user_id)
-                        if user_info.get("success"):
-                            user_name = user_info.get("display_name")
+                        user_name = self._get_user_name(user_id)
+                        if user_name:
                             clean_text = f"{user_name}: {clean_text}"
                     
-                    self.logger.debug(f"BedrockClientに渡すメッセージ(単一DM): {clean_text}")
+                    self.logger.debug("BedrockClientに渡すメッセージ(単一DM): %s", clean_text)
                     response = self.bedrock_client.generate_response(clean_text)
+                    response_ready.set()
+                    
+                    # 共通の応答処理メソッドを使用
+                    self._process_response(channel, thread_ts, response, loading_future)
                 else:
                     self.logger.error("No messages found in thread")
-                    return
             else:
                 thread_messages = self.slack_client.get_thread_messages(channel, thread_ts)
+                # ローディングメッセージが取得結果に混ざらないよう、スレッド取得後に送信して応答生成と並行させる
+                loading_future = self._start_loading_message(channel, thread_ts)
                 # メンションタグを削除
                 cleaned_messages = self._clean_messages(thread_messages)
                 # クリーニングしたメッセージを直接BedrockClientに渡す
-                self.logger.debug(f"BedrockClientに渡すメッセージ(スレッドDM): {json.dumps(cleaned_messages, ensure_ascii=False, indent=2)}")
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug("BedrockClientに渡すメッセージ(スレッドDM): %s", json.dumps(cleaned_messages, ensure_ascii=False))
                 response = self.bedrock_client.generate_response(cleaned_messages)
-            
-            # 共通の応答処理メソッドを使用
-            self._process_response(channel, thread_ts, response)
+                
+                # 共通の応答処理メソッドを使用
+                self._process_response(channel, thread_ts, response, loading_future)
         except Exception as e:
             self.logger.error(f"Error in _handle_direct_message: {e}", exc_info=True)
+            self._show_loading_error(channel, loading_future, e)
     
     def _clean_messages(self, messages):
         """メッセージリストの各テキストからメンションタグを削除し、ユーザー名情報を追加する"""
-        self.logger.debug(f"元のメッセージ: {json.dumps(messages, ensure_ascii=False, indent=2)}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("元のメッセージ: %s", json.dumps(messages, ensure_ascii=False))
         
-        cleaned_messages = []
-        for message in messages:
-            # 通常のテキストを処理
-            text = message.get("text", "")
-            clean_text = self._process_slack_formatting(text)
-            
-            # blocksフィールドから追加情報を抽出
-            blocks_text = self._extract_text_from_blocks(message.get("blocks", []))
-            if blocks_text:
-                self.logger.debug(f"blocksから抽出したテキスト: {blocks_text}")
-                if clean_text:
-                    clean_text = f"{clean_text}\n\n{blocks_text}"
-                else:
-                    clean_text = blocks_text
-            
-            if clean_text:
-                # 元のメッセージをコピーして、テキストだけ置き換える
-                cleaned_message = message.copy()
-                cleaned_message["text"] = clean_text
-                
-                # ユーザー名情報を追加
-                user_id = message.get("user")
-                if user_id and not message.get("bot_id"):
-                    user_info = self.slack_client.get_user_info(user_id)
-                    if user_info.get("success"):
-                        cleaned_message["user_name"] = user_info.get("display_name")
-                        self.logger.debug(f"ユーザー名を追加: user_id={user_id}, user_name={user_info.get('display_name')}")
-                
-                cleaned_messages.append(cleaned_message)
+        # スレッド内のユーザー名はまとめて並行に取得する
+        user_ids = list({
+            message["user"] for message in messages
+            if message.get("user") and not message.get("bot_id")
+        })
+        if len(user_ids) <= 1:
+            # 1人だけならスレッドを切り替えずにその場で取得する
+            user_names = {user_id: self._get_user_name(user_id) for user_id in user_ids}
+        else:
+            user_names = dict(zip(user_ids, self.io_executor.map(self._get_user_name, user_ids)))
+        
+        cleaned_messages = [
+            self._build_cleaned_message(message, clean_text, user_names)
+            for message in messages
+            if (clean_text := self._build_message_text(message))
+        ]
         
-        self.logger.debug(f"クリーニング後のメッセージ: {json.dumps(cleaned_messages, ensure_ascii=False, indent=2)}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("クリーニング後のメッセージ: %s", json.dumps(cleaned_messages, ensure_ascii=False))
         return cleaned_messages
     
+    def _build_cleaned_message(self, message, clean_text, user_names):
+        """後続の処理で参照するフィールドだけを持つ辞書を作る（blocks等の大きな構造はコピーしない）"""
+        get = message.get
+        user_id = get("user")
+        bot_id = get("bot_id")
+        cleaned_message = {
+            "text": clean_text,
+            "user": user_id,
+            "ts": get("ts"),
+            "bot_id": bot_id
+        }
+        
+        # ユーザー名情報を追加
+        user_name = None if bot_id else user_names.get(user_id)
+        if user_name:
+            cleaned_message["user_name"] = user_name
+        return cleaned_message
+    
+    def _get_user_name(self, user_id):
+        """ユーザーの表示名を取得（一定時間キャッシュする）"""
+        now = time.monotonic()
+        with self._user_cache_lock:
+            cached = self._user_cache.get(user_id)
+            if cached and cached[1] > now:
+                self._user_cache.move_to_end(user_id)
+                return cached[0]
+        
+        # API呼び出し中はロックを保持しない
+        user_info = self.slack_client.get_user_info(user_id)
+        if not user_info.get("success"):
+            return None
+        
+        user_name = user_info.get("display_name")
+        with self._user_cache_lock:
+            self._user_cache[user_id] = (user_name, now + _USER_CACHE_TTL)
+            self._user_cache.move_to_end(user_id)
+            while len(self._user_cache) > _USER_CACHE_MAX:
+                self._user_cache.popitem(last=False)
+        return user_name
+    
+    def _build_message_text(self, message):
+        """メッセージ本文とblocksのテキストを整形して結合する（同じスレッドへの再メンション時は再利用）"""
+        text = message.get("text", "")
+        ts = message.get("ts")
+        if ts is None:
+            return self._format_message_text(message, text)
+        
+        # 編集されたメッセージはテキストが変わるためキーに含める
+        key = (ts, text)
+        with self._clean_cache_lock:
+            cached = self._clean_cache.get(key)
+            if cached is not None:
+                self._clean_cache.move_to_end(key)
+                return cached
+        
+        clean_text = self._format_message_text(message, text)
+        size = len(text) + len(clean_text)
+        if size > _CLEAN_CACHE_MAX_CHARS:
+            return clean_text
+        
+        with self._clean_cache_lock:
+            previous = self._clean_cache.pop(key, None)
+            if previous is not None:
+                self._clean_cache_chars -= len(text) + len(previous)
+            self._clean_cache[key] = clean_text
+            self._clean_cache_chars += size
+            # 合計文字数が上限を超えた分を古い順に削除
+            while self._clean_cache_chars > _CLEAN_CACHE_MAX_CHARS:
+                (_, old_text), old_clean_text = self._clean_cache.popitem(last=False)
+                self._clean_cache_chars -= len(old_text) + len(old_clean_text)
+        return clean_text
+    
+    def _format_message_text(self, message, text):
+        """メッセージ本文とblocksのテキストを整形して結合する"""
+        # 通常のテキストを処理
+        clean_text = self._process_slack_formatting(text)
+        
+        # blocksフィールドから追加情報を抽出
+        blocks_text = self._extract_text_from_blocks(message.get("blocks", []))
+        if blocks_text:
+            self.logger.debug("blocksから抽出したテキスト: %s", blocks_text)
+            clean_text = f"{clean_text}\n\n{blocks_text}" if clean_text else blocks_text
+        
+        return clean_text
+    
     def _extract_text_from_blocks(self, blocks):
         """blocksフィールドからテキスト情報を抽出する"""
-        extracted_texts = []
-        
+        return "\n".join(self._iter_block_texts(blocks))
+    
+    def _iter_block_texts(self, blocks):
+        """blocks内のテキストを順に返す"""
         for block in blocks:
-            block_type = block.get("type")
+            get = block.get
+            block_type = get("type")
             
             # sectionブロックの処理
-            if block_type == "section" and "text" in block:
-                text_obj = block["text"]
-                if text_obj.get("type") == "mrkdwn":
-                    extracted_texts.append(self._process_slack_formatting(text_obj.get("text", "")))
+            if block_type == "section":
+                text_obj = get("text")
+                if text_obj and text_obj.get("type") == "mrkdwn":
+                    yield self._process_slack_formatting(text_obj.get("text", ""))
             
             # contextブロックの処理
-            elif block_type == "context" and "elements" in block:
-                for element in block["elements"]:
+            elif block_type == "context":
+                for element in get("elements", ()):
                     if element.get("type") == "mrkdwn":
-                        extracted_texts.append(self._process_slack_formatting(element.get("text", "")))
+                        yield self._process_slack_formatting(element.get("text", ""))
             
             # rich_textブロックの処理
-            elif block_type == "rich_text" and "elements" in block:
-                for section in block["elements"]:
-                    if section.get("type") == "rich_text_section" and "elements" in section:
-                        for element in section["elements"]:
+            elif block_type == "rich_text":
+                for section in get("elements", ()):
+                    if section.get("type") == "rich_text_section":
+                        for element in section.get("elements", ()):
                             if element.get("type") == "text":
-                                extracted_texts.append(element.get("text", ""))
-        
-        return "\n".join(extracted_texts) if extracted_texts else ""
+                                yield element.get("text", "")
     
-    def _process_response(self, channel, thread_ts, response_text):
-        """応答テキストを処理してSlackに送信する共通ロジック"""
-        # ローディングメッセージの送信
-        loading_blocks = [
-            {
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": ":hourglass_flowing_sand: *処理中です...*"
-                }
-            }
-        ]
-        
-        result = self.slack_client.send_message(
+    def _start_loading_message(self, channel, thread_ts, response_ready=None):
+        """ローディングメッセージの送信をバックグラウンドで開始"""
+        return self.io_executor.submit(self._send_loading_message, channel, thread_ts, response_ready)
+    
+    def _send_loading_message(self, channel, thread_ts, response_ready=None):
+        """ローディングメッセージを送信（猶予時間内に応答が揃った場合は送信しない）"""
+        if response_ready is not None and response_ready.wait(_LOADING_GRACE_PERIOD):
+            return {}
+        return self.slack_client.send_message(
             channel=channel,
-            text="処理中です...",
+            text=_LOADING_TEXT,
             thread_ts=thread_ts,
-            blocks=loading_blocks
+            blocks=_LOADING_BLOCKS
         )
+    
+    def _show_loading_error(self, channel, loading_future, exception):
+        """送信済みのローディングメッセージがあればエラー表示に置き換える"""
+        if loading_future is None:
+            return
+        try:
+            result = loading_future.result()
+        except Exception as e:
+            self.logger.error(f"Error sending loading message: {e}")
+            return
+        
+        if result.get("success") and result.get("ts"):
+            self._show_error_message(channel, result["ts"], f"エラーが発生しました: {str(exception)}", str(exception))
+    
+    def _process_response(self, channel, thread_ts, response_text, loading_future=None):
+        """応答テキストを処理してSlackに送信する共通ロジック"""
+        # 先行して送信したローディングメッセージがあればその結果を使う
+        if loading_future is not None:
+            result = loading_future.result()
+        else:
+            result = self._send_loading_message(channel, thread_ts)
         
         temp_ts = result.get("ts") if result.get("success") else None
         
         try:
-            # 応答をSlack形式に変換
-            slack_response = self.converter.markdown_to_slack_format(response_text)
+            # 空の応答は変換せずに固定メッセージで置き換える
+            if not response_text or not response_text.strip():
+                self.logger.warning("Empty response received, skipping Slack formatting")
+                slack_response = _EMPTY_RESPONSE_TEXT
+            else:
+                # 応答をSlack形式に変換
+                slack_response = _to_slack_format(response_text)
             
             # メッセージを更新
             if temp_ts:
@@ -280,10 +498,7 @@ class SlackService:
         error_blocks = [
             {
                 "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": f":x: *エラーが発生しました*\n```{error_detail}```"
-                }
+                "text": {"type": "mrkdwn", "text": _ERROR_BLOCK_TEXT.format(error_detail)}
             }
         ]
         
@@ -296,16 +511,16 @@ class SlackService:
     
     def _process_slack_formatting(self, text):
         """Slackの特殊フォーマットを処理する"""
-        # メンションタグを削除
-        text = re.sub(r'<@[A-Z0-9]+>', '', text)
-        
-        # URLタグを処理 (<https://example.com|表示テキスト> → https://example.com (表示テキスト))
-        text = re.sub(r'<(https?://[^|>]+)\|([^>]+)>', r'\1 (\2)', text)
+        # タグを含まないテキストは正規表現を通さない（"<"と">"の両方がなければタグは成立しない）
+        if "<" not in text or ">" not in text:
+            return text.strip()
         
-        # リンクテキストのないURLタグを処理 (<https://example.com> → https://example.com)
-        text = re.sub(r'<(https?://[^>]+)>', r'\1', text)
+        if self._bot_mention and self._bot_mention in text:
+            text = text.replace(self._bot_mention, '')
+            if "<" not in text or ">" not in text:
+                return text.strip()
         
-        return text.strip()
+        return _SLACK_FORMAT_RE.sub(_replace_slack_format, text).strip()
     
     def _remove_mention_tags(self, text):
         """メッセージテキストからメンションタグを削除（後方互換性のため残す）"""
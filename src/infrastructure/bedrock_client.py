@@ -1,9 +1,12 @@
 import boto3
 import asyncio
 import json
+import logging
 import functools
 import re
 import os
+import threading
+from itertools import groupby
 from typing import Dict, Any, List, Union, Optional, Set
 
 from mcp import StdioServerParameters
@@ -17,6 +20,31 @@ def ensure_async_loop(func):
     @functools.wraps(func)
     def wrapper(self, *args, **kwargs):
         loop = self._get_or_create_event_loop()
+        if loop.is_running():
+            # MCPセッションを保持するループへ別スレッドから投入する
+            return asyncio.run_coroutine_threadsafe(func(self, *args, **kwargs), loop).result()
+        return loop.run_until_complete(func(self, *args, **kwargs))
+    return wrapper
+
+SYSTEM_PROMPT_FILE = "system_prompt.md"
+
+# InvokeInlineAgentのinputTextの最大文字数（長いスレッドは参考情報を省いてこの範囲に収める）
+MAX_INPUT_CHARS = 25_000
+_REFERENCE_HEADER = "\n\n参考情報：\n"
+_REFERENCE_SEPARATOR = "\n\n"
+
+# 呼び出し元スレッドごとに使い回すイベントループ
+_thread_local = threading.local()
+
+def run_in_thread_loop(func):
+    # InlineAgentはBedrockを同期的に呼び出すため、MCP用ループ上で実行すると他の応答生成まで止まる
+    # 呼び出し元スレッドのループで実行し、ツール呼び出しだけCustomMCPStdioがMCP用ループへ転送する
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        loop = getattr(_thread_local, "loop", None)
+        if loop is None or loop.is_closed():
+            loop = asyncio.new_event_loop()
+            _thread_local.loop = loop
         return loop.run_until_complete(func(self, *args, **kwargs))
     return wrapper
 
@@ -37,20 +65,42 @@ class BedrockClient:
         self.config_file_path = config_file_path
         self.action_groups = []
         self.mcp_clients = {}
+        self._loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
+        self._system_prompt = None
+        self._system_prompt_mtime = None
         
         self.mcp_config = self._load_mcp_config()
     
     def _get_or_create_event_loop(self):
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_closed():
-                raise RuntimeError("Event loop is closed")
-            return loop
-        except RuntimeError:
-            # 新しいイベントループを作成し、現在のスレッドに設定
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            return loop
+        """MCPセッションを共有するため、専用スレッドで動くイベントループを返す"""
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                loop.call_soon(ready.set)
+                self._loop_thread = threading.Thread(target=loop.run_forever, name="bedrock-event-loop", daemon=True)
+                self._loop_thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+    
+    def close_event_loop(self):
+        """専用スレッドのイベントループを停止して閉じる"""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+            if loop is None or loop.is_closed():
+                return
+            loop.call_soon_threadsafe(loop.stop)
+            self._loop_thread.join()
+            loop.close()
+    
+    def close(self):
+        """MCPクライアントとイベントループを停止する（未初期化の場合は新たにスレッドを起動しない）"""
+        if self._loop is not None and self.mcp_clients:
+            self.cleanup_mcp_clients()
+        self.close_event_loop()
     
     def _load_mcp_config(self) -> Dict:
         try:
@@ -60,13 +110,23 @@ class BedrockClient:
             self.logger.error(f"Error loading MCP configuration: {e}")
             return {}
     
+    def _get_system_prompt(self) -> str:
+        """システムプロンプトを取得（ファイルが更新されるまで読み込み結果を再利用する）"""
+        try:
+            mtime = os.stat(SYSTEM_PROMPT_FILE).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._system_prompt is None or mtime != self._system_prompt_mtime:
+            self._system_prompt = self._load_system_prompt()
+            self._system_prompt_mtime = mtime
+        return self._system_prompt
+    
     def _load_system_prompt(self) -> str:
-        system_prompt_file = "system_prompt.md"
         try:
-            with open(system_prompt_file, 'r', encoding='utf-8') as f:
+            with open(SYSTEM_PROMPT_FILE, 'r', encoding='utf-8') as f:
                 return f.read().strip()
         except Exception as e:
-            self.logger.warning(f"Failed to load system prompt file: {e}")
+            self.logger.warning("Failed to load system prompt file: %s", e)
             return "You are a helpful AI assistant. Speak in Japanese"
     
     @ensure_async_loop
@@ -185,21 +245,21 @@ class BedrockClient:
                 if "functions" in mcp_client.function_schema:
                     for function in mcp_client.function_schema["functions"]:
                         if "name" in function and len(function["name"]) > 64:
-                            self.logger.warning(f"Tool name '{function['name']}' is too long (> 64 chars) and has been truncated")
+                            self.logger.warning("Tool name '%s' is too long (> 64 chars) and has been truncated", function['name'])
                 
             self.action_groups.append(action_group)
-            self.logger.info(f"Created action group for {server_name}")
+            self.logger.info("Created action group for %s", server_name)
         except Exception as e:
             self.logger.error(f"Error creating action group for {server_name}: {e}")
             await mcp_client.cleanup()
             self.mcp_clients.pop(server_name, None)
     
-    @ensure_async_loop
+    @run_in_thread_loop
     async def generate_response(self, input_data: Union[str, List[Dict]], timeout: int = 300) -> str:
-        system_text = self._load_system_prompt()
+        system_text = self._get_system_prompt()
         input_text = self._process_input_data(input_data)
 
-        self.logger.debug(f"Input text to Bedrock: {input_text}")
+        self.logger.debug("Input text to Bedrock: %s", input_text)
         
         agent = InlineAgent(
             foundation_model=self.model_id,
@@ -210,10 +270,11 @@ class BedrockClient:
         )
         
         try:
-            self.logger.debug(f"Invoking agent with timeout: {timeout} seconds")
-            self.logger.debug(f"Action groups count: {len(self.action_groups)}")
-            for i, ag in enumerate(self.action_groups):
-                self.logger.debug(f"Action group {i}: {ag.name if hasattr(ag, 'name') else 'Unknown'}")
+            self.logger.debug("Invoking agent with timeout: %s seconds", timeout)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("Action groups count: %d", len(self.action_groups))
+                for i, ag in enumerate(self.action_groups):
+                    self.logger.debug("Action group %d: %s", i, getattr(ag, 'name', 'Unknown'))
             
             # タイムアウト設定を追加
             self.logger.debug("Starting agent.invoke with wait_for")
@@ -228,105 +289,114 @@ class BedrockClient:
             return f"エラーが発生しました: {str(e)}"
     
     def _process_input_data(self, input_data: Union[str, List[Dict]]) -> str:
-        if isinstance(input_data, str):
-            self.logger.debug(f"入力データ(文字列): {input_data}")
+        input_type = type(input_data)
+        if input_type is str:
+            self.logger.debug("入力データ(文字列): %s", input_data)
             return input_data
-        elif isinstance(input_data, list):
-            self.logger.debug(f"入力データ(リスト): {json.dumps(input_data, ensure_ascii=False, indent=2)}")
-            
-            if all(isinstance(item, dict) and "text" in item for item in input_data):
-                conversation = self.create_conversation_history_from_messages(input_data)
-                self.logger.debug(f"変換後の会話履歴: {json.dumps(conversation, ensure_ascii=False, indent=2)}")
-                result = self._convert_conversation_to_text(conversation)
-                self.logger.debug(f"テキスト変換後: {result}")
-                return result
-            elif all(isinstance(item, dict) and "role" in item for item in input_data):
-                result = self._convert_conversation_to_text(input_data)
-                self.logger.debug(f"テキスト変換後: {result}")
-                return result
-            else:
-                raise ValueError("Invalid message format")
-        else:
+        if input_type is not list:
             raise ValueError("Invalid input format")
+        
+        debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            self.logger.debug("入力データ(リスト): %s", json.dumps(input_data, ensure_ascii=False, indent=2))
+        
+        if all(isinstance(item, dict) and "text" in item for item in input_data):
+            conversation = self.create_conversation_history_from_messages(input_data)
+            if debug_enabled:
+                self.logger.debug("変換後の会話履歴: %s", json.dumps(conversation, ensure_ascii=False, indent=2))
+        elif all(isinstance(item, dict) and "role" in item for item in input_data):
+            conversation = input_data
+        else:
+            raise ValueError("Invalid message format")
+        
+        result = self._convert_conversation_to_text(conversation)
+        self.logger.debug("テキスト変換後: %s", result)
+        return result
     
     def create_conversation_history_from_messages(self, messages: List[Dict]) -> List[Dict]:
-        conversation = []
-        
-        for message in messages:
-            text = message.get("text", "")
-            
-            if text:
-                role = "assistant" if message.get("bot_id") else "user"
-                
-                # ユーザー名情報を含める
-                user_name = message.get("user_name", "")
-                original_text = text
-                if user_name and role == "user":
-                    # ユーザー名を含めたテキストを作成
-                    text = f"{user_name}: {text}"
-                    self.logger.debug(f"ユーザー名を追加: '{original_text}' → '{text}'")
-                
-                conversation.append({
-                    "role": role,
-                    "content": [{"text": text}]
-                })
+        # メンションの除去はSlackService側で済んでいるため、ここでは一度の走査で組み立てるだけ
+        conversation = (
+            self._create_conversation_entry(message, text)
+            for message in messages
+            if (text := message.get("text", ""))
+        )
+        # 再送や編集で連続した同一メッセージはBedrockへ送るトークンを増やすだけなので1件にまとめる
+        return [
+            next(group)
+            for _, group in groupby(conversation, key=lambda entry: (entry["role"], entry["content"][0]["text"]))
+        ]
+    
+    def _create_conversation_entry(self, message: Dict, text: str) -> Dict:
+        """Slackメッセージ1件を会話履歴の1件に変換する（ユーザーの発言には表示名を付ける）"""
+        if message.get("bot_id"):
+            return {"role": "assistant", "content": [{"text": text}]}
         
-        return conversation
+        user_name = message.get("user_name")
+        if user_name:
+            text = f"{user_name}: {text}"
+        return {"role": "user", "content": [{"text": text}]}
     
     def _convert_conversation_to_text(self, conversation: List[Dict]) -> str:
         if not conversation:
             return ""
         
-        # 最新のメッセージ（リストの最後のメッセージ）を取得
-        latest_message = conversation[-1]
-        latest_role = latest_message.get("role", "")
-        latest_content = latest_message.get("content", [])
-        
-        # 最新メッセージのテキストを抽出
-        if isinstance(latest_content, list):
-            text_parts = []
-            for item in latest_content:
-                if isinstance(item, dict) and "text" in item:
-                    text_parts.append(item["text"])
-            latest_text = "\n".join(text_parts)
-        else:
-            latest_text = str(latest_content)
-        
-        # 最新メッセージを主要な指示として設定
-        prefix = "User: " if latest_role == "user" else "Assistant: "
-        main_instruction = f"{prefix}{latest_text}"
+        # 最新のメッセージ（リストの最後のメッセージ）を主要な指示として設定
+        main_instruction = self._truncate_description(
+            self._format_conversation_message(conversation[-1]), MAX_INPUT_CHARS
+        )
         
-        # 過去のメッセージがある場合は参考情報として追加
+        # 過去のメッセージがある場合は、入力全体が上限に収まる範囲で参考情報として追加
         if len(conversation) > 1:
-            reference_messages = []
-            for message in conversation[:-1]:  # 最新メッセージを除く
-                role = message.get("role", "")
-                content = message.get("content", [])
-                
-                if isinstance(content, list):
-                    text_parts = []
-                    for item in content:
-                        if isinstance(item, dict) and "text" in item:
-                            text_parts.append(item["text"])
-                    text = "\n".join(text_parts)
-                else:
-                    text = str(content)
-                
-                prefix = "User: " if role == "user" else "Assistant: "
-                reference_messages.append(f"{prefix}{text}")
-            
-            reference_info = "\n\n".join(reference_messages)
-            return f"{main_instruction}\n\n参考情報：\n{reference_info}"
+            budget = MAX_INPUT_CHARS - len(main_instruction) - len(_REFERENCE_HEADER)
+            references = self._truncate_references(
+                list(map(self._format_conversation_message, conversation[:-1])), budget
+            )
+            if references:
+                return main_instruction + _REFERENCE_HEADER + _REFERENCE_SEPARATOR.join(references)
         
         # 過去のメッセージがない場合は主要な指示のみ返す
         return main_instruction
     
+    def _truncate_references(self, references: List[str], budget: int) -> List[str]:
+        """参考情報をbudget文字に収める（スレッド冒頭と直近のメッセージを残し、間の古いやり取りを省く）"""
+        if sum(map(len, references)) + len(_REFERENCE_SEPARATOR) * (len(references) - 1) <= budget:
+            return references
+        
+        # 冒頭のメッセージだけで上限を使い切らないよう、枠の半分までに切り詰める（入らない場合は省く）
+        head = references[0]
+        head_budget = budget // 2
+        if len(head) > head_budget:
+            head = self._truncate_description(head, head_budget) if head_budget > 3 else ""
+        
+        remaining = budget - len(head)
+        tail = []
+        for text in reversed(references[1:]):
+            remaining -= len(text) + len(_REFERENCE_SEPARATOR)
+            if remaining < 0:
+                break
+            tail.append(text)
+        tail.reverse()
+        
+        kept = [head, *tail] if head else tail
+        self.logger.info("Truncated reference messages from %d to %d", len(references), len(kept))
+        return kept
+    
+    def _format_conversation_message(self, message: Dict) -> str:
+        """会話履歴の1件を「User: 本文」形式のテキストにする"""
+        content = message.get("content", [])
+        if isinstance(content, list):
+            text = "\n".join(item["text"] for item in content if isinstance(item, dict) and "text" in item)
+        else:
+            text = str(content)
+        prefix = "User: " if message.get("role", "") == "user" else "Assistant: "
+        return f"{prefix}{text}"
+    
     @ensure_async_loop
     async def cleanup_mcp_clients(self):
         for server_name, mcp_client in list(self.mcp_clients.items()):
             try:
                 await mcp_client.cleanup()
-                self.logger.info(f"Cleaned up MCP client for {server_name}")
+                self.logger.info("Cleaned up MCP client for %s", server_name)
             except Exception as e:
                 self.logger.error(f"Error cleaning up MCP client for {server_name}: {e}")
             finally:
@@ -1,3 +1,4 @@
+import asyncio
 from typing import List, Set, Dict, Any, Callable
 from mcp import ListToolsResult
 from mcp.shared.exceptions import McpError
@@ -5,6 +6,10 @@ from InlineAgent.tools.mcp import MCPStdio
 from InlineAgent.types import FunctionDefination
 from pydantic import validate_call
 
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
 class CustomMCPStdio(MCPStdio):
     """
     MCPStdioのカスタム実装。
@@ -36,19 +41,23 @@ class CustomMCPStdio(MCPStdio):
             }
             
             # Process input schema properties
-            if "properties" in tool.inputSchema:
-                for param_name, param_details in tool.inputSchema["properties"].items():
-                    function["parameters"][param_name] = {
+            input_schema = tool.inputSchema
+            properties = input_schema.get("properties")
+            if properties is not None:
+                # パラメータが5つ以上の場合はスキップ（例外を発生させない）
+                if len(properties) >= 5:
+                    logger.info("Tool '%s' has %d parameters (>= 5) and will be skipped.", tool.name, len(properties))
+                    continue
+
+                required = set(input_schema.get("required", ()))
+                parameters = function["parameters"]
+                for param_name, param_details in properties.items():
+                    parameters[param_name] = {
                         "description": param_details.get("description", param_name),
                         "type": param_details.get("type", "string"),
-                        "required": param_name in tool.inputSchema.get("required", []),
+                        "required": param_name in required,
                     }
 
-                # パラメータが5つ以上の場合はスキップ（例外を発生させない）
-                if len(function["parameters"]) >= 5:
-                    print(f"Tool '{tool.name}' has {len(function['parameters'])} parameters (>= 5) and will be skipped.")
-                    continue
-
             self.function_schema["functions"].append(function)
             
     @validate_call
@@ -61,14 +70,20 @@ class CustomMCPStdio(MCPStdio):
 
         tools = await self.session.list_tools()
         tools_list = tools.tools
+        # セッションは接続したループでしか使えないため、別ループからの呼び出しはこのループへ転送する
+        session_loop = asyncio.get_running_loop()
 
         # エラーハンドリングを追加したcallable関数を作成
         def create_callable(tool_name):
             async def callable(*args, **kwargs):
                 try:
-                    response = await self.session.call_tool(
-                        tool_name, arguments=kwargs
-                    )
+                    call = self.session.call_tool(tool_name, arguments=kwargs)
+                    if asyncio.get_running_loop() is session_loop:
+                        response = await call
+                    else:
+                        response = await asyncio.wrap_future(
+                            asyncio.run_coroutine_threadsafe(call, session_loop)
+                        )
                     return response.content[0].text
                 except McpError as e:
                     # MCPエラーオブジェクトを文字列に変換して返す
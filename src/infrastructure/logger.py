@@ -1,10 +1,15 @@
+import functools
 import logging
 import sys
 
+@functools.lru_cache(maxsize=None)
 def setup_logger(name=None, level=logging.INFO):
     """
     Configure and return a logger instance
     
+    Memoized per (name, level) so repeated imports or worker forks reuse
+    the configured logger instead of reconfiguring it.
+    
     Args:
         name: Logger name (default: root logger)
         level: Logging level (default: INFO)
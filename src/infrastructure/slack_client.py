@@ -1,19 +1,30 @@
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry.builtin_handlers import ConnectionErrorRetryHandler, RateLimitErrorRetryHandler
 from src.infrastructure.logger import setup_logger
 
 class SlackClient:
     """Handles communication with Slack API"""
     
-    def __init__(self, token, logger=None):
+    def __init__(self, token, logger=None, timeout=10):
         """
         Initialize SlackClient
         
         Args:
             token (str): Slack API token
             logger: Logger instance (optional)
+            timeout (int): HTTP timeout in seconds for each Slack API call
         """
-        self.client = WebClient(token=token)
+        # 1つのWebClientをプロセス内で共有する
+        # レート制限(429)と一時的な接続エラーはSDK側でバックオフして再試行する
+        self.client = WebClient(
+            token=token,
+            timeout=timeout,
+            retry_handlers=[
+                RateLimitErrorRetryHandler(max_retry_count=3),
+                ConnectionErrorRetryHandler(max_retry_count=2),
+            ]
+        )
         self.logger = logger or setup_logger(__name__)
     
     def send_message(self, channel, text, thread_ts=None, blocks=None):
@@ -30,7 +41,7 @@ class SlackClient:
             dict: Response data with success status and error information if applicable
         """
         try:
-            self.logger.info(f"Sending message to channel {channel}")
+            self.logger.info("Sending message to channel %s", channel)
             params = {
                 "channel": channel,
                 "text": text,
@@ -61,14 +72,14 @@ class SlackClient:
             list: List of messages in the thread (chronological order)
         """
         try:
-            self.logger.debug(f"Getting thread messages from channel {channel}, thread {thread_ts}")
+            self.logger.debug("Getting thread messages from channel %s, thread %s", channel, thread_ts)
             response = self.client.conversations_replies(
                 channel=channel,
                 ts=thread_ts
             )
             
             messages = response.get('messages', [])
-            self.logger.debug(f"Retrieved {len(messages)} messages from thread")
+            self.logger.debug("Retrieved %d messages from thread", len(messages))
             return messages
         except SlackApiError as e:
             self.logger.error(f"Error getting thread messages: {e}")
@@ -88,7 +99,7 @@ class SlackClient:
             dict: Response data with success status and error information if applicable
         """
         try:
-            self.logger.info(f"Updating message in channel {channel}")
+            self.logger.info("Updating message in channel %s", channel)
             params = {
                 "channel": channel,
                 "ts": ts,
@@ -151,23 +162,38 @@ class SlackClient:
         if len(text) <= 3900:
             return self.send_message(channel, text, thread_ts, blocks)
         
-        # 長いメッセージを分割
+        # 長いメッセージを分割して順番に送信
         message_parts = self._split_message(text)
+        return self._send_message_parts(channel, message_parts, thread_ts)
+    
+    def _send_message_parts(self, channel, message_parts, thread_ts=None, start_index=0):
+        """
+        Send split message parts in order, numbering them as [i/N]
+        
+        Args:
+            channel (str): Channel ID to send message to
+            message_parts (list): All parts of the split message
+            thread_ts (str, optional): Thread timestamp (for replies)
+            start_index (int): Index of the first part to send (earlier parts are already posted)
+            
+        Returns:
+            dict: Response data with success status and timestamps of sent messages
+        """
+        total = len(message_parts)
         sent_messages = []
         
-        # 分割したメッセージを順番に送信
-        for i, part in enumerate(message_parts):
-            prefix = f"[{i+1}/{len(message_parts)}] " if len(message_parts) > 1 else ""
+        for i in range(start_index, total):
+            prefix = f"[{i+1}/{total}] " if total > 1 else ""
             result = self.send_message(
                 channel=channel,
-                text=prefix + part,
+                text=prefix + message_parts[i],
                 thread_ts=thread_ts
             )
             
             if not result.get("success"):
                 return {
                     "success": False, 
-                    "error": f"Failed to send part {i+1}/{len(message_parts)}: {result.get('error')}",
+                    "error": f"Failed to send part {i+1}/{total}: {result.get('error')}",
                     "error_code": result.get("error_code"),
                     "sent_messages": sent_messages
                 }
@@ -176,7 +202,7 @@ class SlackClient:
         
         return {
             "success": True,
-            "message": f"Sent {len(message_parts)} message parts",
+            "message": f"Sent {total} message parts",
             "sent_messages": sent_messages
         }
     
@@ -197,21 +223,19 @@ class SlackClient:
         if len(text) <= 3900:
             return self.update_message(channel, ts, text, blocks)
         
-        # 長いメッセージの場合、元のメッセージを更新して分割メッセージを送信
+        # 長いメッセージの場合、元のメッセージを1つ目のパートで更新し、残りをスレッドに送信
+        message_parts = self._split_message(text)
+        prefix = f"[1/{len(message_parts)}] " if len(message_parts) > 1 else ""
         update_result = self.update_message(
             channel=channel,
             ts=ts,
-            text="メッセージが長いため、複数のメッセージに分割します。"
+            text=prefix + message_parts[0]
         )
         
         if not update_result.get("success"):
             return update_result
         
-        # スレッド情報を取得
-        thread_ts = ts
-        
-        # 長いメッセージを送信
-        return self.send_long_message(channel, text, thread_ts)
+        return self._send_message_parts(channel, message_parts, thread_ts=ts, start_index=1)
     
     def get_user_info(self, user_id):
         """
@@ -224,11 +248,11 @@ class SlackClient:
             dict: User information with success status and user data if applicable
         """
         try:
-            self.logger.debug(f"Getting user info for user {user_id}")
+            self.logger.debug("Getting user info for user %s", user_id)
             response = self.client.users_info(user=user_id)
             
             user_data = response.get('user', {})
-            self.logger.debug(f"Retrieved user info for {user_id}")
+            self.logger.debug("Retrieved user info for %s", user_id)
             
             return {
                 "success": True,
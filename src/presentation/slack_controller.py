@@ -1,16 +1,64 @@
-from bottle import Bottle, request, response
-import json
+from bottle import Bottle, BaseRequest, request, response
+import orjson
+import functools
+import logging
 import time
 import os
+from types import MappingProxyType
 from slack_sdk.signature import SignatureVerifier
 from src.infrastructure.logger import setup_logger
 
+class OrjsonPlugin:
+    """dict/listの戻り値をorjsonでシリアライズするBottleプラグイン"""
+    name = 'orjson'
+    api = 2
+    
+    def apply(self, callback, route):
+        @functools.wraps(callback)
+        def wrapper(*args, **kwargs):
+            rv = callback(*args, **kwargs)
+            if isinstance(rv, (dict, list)):
+                response.content_type = 'application/json'
+                return orjson.dumps(rv)
+            return rv
+        return wrapper
+
+# 受け付けるリクエストボディの上限（署名検証前に読み込むため、Slackのイベントに十分な大きさに留める）
+BaseRequest.MEMFILE_MAX = 1024 * 1024
+
 # グローバル変数
 app = Bottle()
+app.uninstall('json')
+app.install(OrjsonPlugin())
 logger = None
 slack_service = None
 signature_verifier = None
 
+_CORS_HEADERS = (
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Origin, Accept, Content-Type, X-Requested-With, X-CSRF-Token'),
+)
+
+# 固定レスポンスは起動時に一度だけシリアライズする
+_INDEX_BODY = orjson.dumps({'status': 'ok', 'message': 'API is running'})
+_EMPTY_BODY = b'{}'
+
+# 処理対象のリクエストに必ず含まれるキーワード（パース前の事前判定用）
+_RELEVANT_BODY_MARKERS = (b'"challenge"', b'"app_mention"', b'"message"')
+_STATIC_ERROR_BODIES = MappingProxyType({
+    message: orjson.dumps({'status': 'error', 'message': message})
+    for message in (
+        'Not found',
+        'Internal server error',
+        'Missing verification headers',
+        'Request expired',
+        'Invalid request signature',
+        'Request entity too large',
+        'Length required',
+    )
+})
+
 def error_response(status_code, message, log_message=None, exc_info=False):
     """エラーレスポンスを生成する共通関数"""
     if log_message:
@@ -21,36 +69,56 @@ def error_response(status_code, message, log_message=None, exc_info=False):
             
     response.status = status_code
     response.content_type = 'application/json'
-    return json.dumps({'status': 'error', 'message': message})
+    body = _STATIC_ERROR_BODIES.get(message)
+    return body if body is not None else orjson.dumps({'status': 'error', 'message': message})
+
+def read_request_body(content_length):
+    """Content-Lengthを使ってwsgi.inputから直接リクエストボディを読み込む（上限を超える場合はNone）"""
+    if content_length < 0 or content_length > BaseRequest.MEMFILE_MAX:
+        return None
+    return request.environ['wsgi.input'].read(content_length)
 
 @app.hook('after_request')
 def enable_cors():
     """CORSを有効にする"""
-    response.headers['Access-Control-Allow-Origin'] = '*'
-    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-    response.headers['Access-Control-Allow-Headers'] = 'Origin, Accept, Content-Type, X-Requested-With, X-CSRF-Token'
+    # Originヘッダーのないリクエスト（Slackからのイベント等）はCORS対象外
+    if 'Origin' not in request.headers:
+        return
+    for name, value in _CORS_HEADERS:
+        response.set_header(name, value)
 
 @app.route('/', method='GET')
 def index():
     """ルートエンドポイント"""
-    return {'status': 'ok', 'message': 'API is running'}
+    response.content_type = 'application/json'
+    return _INDEX_BODY
 
 @app.route('/<:path>', method='OPTIONS')
 def options_handler(path=None):
     """OPTIONSリクエストのハンドラ"""
-    return {}
+    response.content_type = 'application/json'
+    return _EMPTY_BODY
 
 @app.route('/default/slack-subscriptions', method='POST')
 def slack_events():
     """Slackイベントを処理するエンドポイント"""
     try:
+        # チャンク転送等ではサイズを読み込む前に検証できないため受け付けない（SlackはContent-Lengthを必ず付与する）
+        content_length = request.environ.get('CONTENT_LENGTH')
+        if not content_length:
+            return error_response(411, 'Length required', "Rejected Slack request without Content-Length")
+        
+        # ボディは一度だけ読み込み、検証とパースで共有する
+        body_raw = read_request_body(int(content_length))
+        if body_raw is None:
+            return error_response(
+                413,
+                'Request entity too large',
+                f"Rejected Slack request body: Content-Length={request.environ.get('CONTENT_LENGTH')}"
+            )
+        
         # リクエスト検証
-        if not signature_verifier:
-            data = request.json
-        else:
-            body_raw = request.body.read()
-            body = body_raw.decode('utf-8')
-            
+        if signature_verifier:
             timestamp = request.headers.get("X-Slack-Request-Timestamp") or request.headers.get("x-slack-request-timestamp")
             signature = request.headers.get("X-Slack-Signature") or request.headers.get("x-slack-signature")
             
@@ -70,7 +138,7 @@ def slack_events():
                 )
             
             if not signature_verifier.is_valid(
-                body=body,
+                body=body_raw,
                 timestamp=timestamp,
                 signature=signature
             ):
@@ -79,22 +147,31 @@ def slack_events():
                     'Invalid request signature',
                     f"Invalid Slack request signature detected. Remote IP: {request.remote_addr}, Timestamp: {timestamp}"
                 )
-            
-            data = json.loads(body)
         
-        # イベント処理
-        logger.info(f"Received Slack event type: {data.get('type')}")
-        logger.debug(f"Event details: {json.dumps(data, indent=2)}")
+        # 処理対象外のイベントはJSONをパースせずに応答
+        if not any(marker in body_raw for marker in _RELEVANT_BODY_MARKERS):
+            logger.debug("Ignoring Slack request without relevant event markers")
+            response.content_type = 'application/json'
+            return _EMPTY_BODY
+        
+        data = orjson.loads(body_raw)
         
+        # URL検証はイベント処理を経由せず即座に応答
         if "challenge" in data:
             logger.info("Responding to Slack verification challenge")
             return {"challenge": data["challenge"]}
         
+        # イベント処理
+        logger.info("Received Slack event type: %s", data.get('type'))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Event details: %s", orjson.dumps(data).decode())
+        
         if data.get("type") == "event_callback":
-            logger.info(f"Processing event callback: {data.get('event', {}).get('type')}")
+            logger.info("Processing event callback: %s", data.get('event', {}).get('type'))
             slack_service.handle_event(data)
         
-        return {}
+        response.content_type = 'application/json'
+        return _EMPTY_BODY
         
     except Exception as e:
         return error_response(400, str(e), f"Error processing Slack event: {e}", exc_info=True)
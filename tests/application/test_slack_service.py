@@ -2,6 +2,7 @@ import pytest
 import threading
 import time
 from unittest.mock import MagicMock, patch, call
+from src.application import slack_service as slack_service_module
 from src.application.slack_service import SlackService
 
 @pytest.fixture
@@ -14,6 +15,14 @@ def service(mock_slack_client, mock_bedrock_client):
         logger=MagicMock()
     )
 
+@pytest.fixture
+def mock_converter():
+    """Markdown変換器のモックに差し替え、変換結果のキャッシュを空にするフィクスチャ"""
+    slack_service_module._to_slack_format.cache_clear()
+    with patch.object(slack_service_module, "_CONVERTER") as mock:
+        yield mock
+    slack_service_module._to_slack_format.cache_clear()
+
 def test_handle_event_basic(service):
     """基本的なイベント処理のテスト"""
     # テストデータ
@@ -58,6 +67,101 @@ def test_handle_event_duplicate(service):
     assert result is True
     assert len(service.processed_events) == 1
 
+def test_handle_event_concurrent_duplicates(service):
+    """同じイベントが同時に届いても一度だけ処理されるテスト"""
+    service._dispatch_event = MagicMock()
+    event_data = {
+        "event_id": "test_event_concurrent",
+        "event": {"type": "app_mention", "channel": "C12345", "ts": "1234567890.123456"}
+    }
+
+    threads = [threading.Thread(target=service.handle_event, args=(event_data,)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    service.executor.shutdown(wait=True)
+
+    # 検証
+    service._dispatch_event.assert_called_once()
+
+def test_handle_event_evicts_oldest_when_full(service):
+    """上限を超えた場合に最も古いイベントだけが削除されるテスト"""
+    service.max_processed_events = 2
+
+    for event_id in ("ev_1", "ev_2", "ev_3"):
+        service.handle_event({"event_id": event_id, "event": {"type": "message", "channel": "C12345"}})
+
+    # 検証
+    assert list(service.processed_events) == ["ev_2", "ev_3"]
+
+def test_handle_event_zero_cache_size(service):
+    """キャッシュ上限が0でもイベントを処理できるテスト"""
+    service.max_processed_events = 0
+    service._dispatch_event = MagicMock()
+
+    # テスト実行
+    result = service.handle_event({"event_id": "ev_zero", "event": {"type": "message", "channel": "C12345"}})
+    service.executor.shutdown(wait=True)
+
+    # 検証
+    assert result is True
+    service._dispatch_event.assert_called_once()
+    assert service._in_flight == set()
+
+def test_handle_event_expires_old_events(service):
+    """保持期間を過ぎたイベントが削除されるテスト"""
+    # time.monotonic自体を差し替えると他のスレッドにも影響するため、モジュールが参照するtimeだけを置き換える
+    mock_time = MagicMock()
+    mock_time.monotonic.side_effect = [0, 50, 100]
+    with patch.object(slack_service_module, "time", mock_time):
+        service.handle_event({"event_id": "ev_old", "event": {"type": "message", "channel": "C12345"}})
+        service.handle_event({"event_id": "ev_mid", "event": {"type": "message", "channel": "C12345"}})
+        service.handle_event({"event_id": "ev_new", "event": {"type": "message", "channel": "C12345"}})
+
+    # 検証（保持期間は60秒）
+    assert "ev_old" not in service.processed_events
+    assert list(service.processed_events) == ["ev_mid", "ev_new"]
+
+def test_handle_event_in_flight_after_eviction(service):
+    """処理中のイベントはキャッシュから削除されても再処理されないテスト"""
+    service.max_processed_events = 1
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_dispatch(event):
+        started.set()
+        release.wait(1)
+
+    service._dispatch_event = MagicMock(side_effect=slow_dispatch)
+    event_data = {"event_id": "ev_slow", "event": {"type": "message", "channel": "C12345"}}
+    service.handle_event(event_data)
+    started.wait(1)
+
+    # 別イベントでキャッシュから押し出した後に再送
+    service.handle_event({"event_id": "ev_other", "event": {"type": "message", "channel": "C12345"}})
+    assert "ev_slow" not in service.processed_events
+    service.handle_event(event_data)
+    release.set()
+    service.executor.shutdown(wait=True)
+
+    # 検証
+    assert service._dispatch_event.call_count == 2
+    assert service._in_flight == set()
+
+def test_handle_event_submit_failure_releases_in_flight(service):
+    """ワーカーへの投入に失敗した場合に処理中の記録を解除するテスト"""
+    service.close()
+    event_data = {"event_id": "ev_closed", "event": {"type": "message", "channel": "C12345"}}
+
+    # テスト実行
+    result = service.handle_event(event_data)
+
+    # 検証
+    assert result is False
+    assert service._in_flight == set()
+    assert "ev_closed" not in service.processed_events
+
 def test_handle_event_bot_message(service):
     """ボットメッセージのテスト"""
     # テストデータ（ボットメッセージ）
@@ -76,8 +180,16 @@ def test_handle_event_bot_message(service):
     
     # 検証
     assert result is True
-    # ボットメッセージは処理されないが、イベントIDは記録される
-    assert "test_event_3" in service.processed_events
+    # ボットメッセージは重複管理に登録されない
+    assert "test_event_3" not in service.processed_events
+
+def test_handle_event_unsupported_type(service):
+    """処理対象外イベントのテスト"""
+    result = service.handle_event({"event_id": "test_event_6", "event": {"type": "member_joined_channel"}})
+
+    # 検証
+    assert result is True
+    assert "test_event_6" not in service.processed_events
 
 def test_handle_event_exception(service):
     """例外発生時のテスト"""
@@ -90,8 +202,7 @@ def test_handle_event_exception(service):
     # 検証
     assert result is False
 
-@patch('threading.Thread')
-def test_dispatch_event_app_mention(mock_thread, service):
+def test_dispatch_event_app_mention(service):
     """app_mentionイベントのディスパッチテスト"""
     # テストデータ
     event = {
@@ -99,16 +210,15 @@ def test_dispatch_event_app_mention(mock_thread, service):
         "channel": "C12345",
         "ts": "1234567890.123456"
     }
+    service.executor = MagicMock()
     
     # テスト実行
     service.handle_event({"event_id": "test_event_4", "event": event})
     
     # 検証
-    mock_thread.assert_called_once()
-    mock_thread.return_value.start.assert_called_once()
+    service.executor.submit.assert_called_once_with(service._process_event, "test_event_4", event)
 
-@patch('threading.Thread')
-def test_dispatch_event_direct_message(mock_thread, service):
+def test_dispatch_event_direct_message(service):
     """DMメッセージのディスパッチテスト"""
     # テストデータ
     event = {
@@ -117,13 +227,13 @@ def test_dispatch_event_direct_message(mock_thread, service):
         "channel": "D12345",
         "ts": "1234567890.123456"
     }
+    service.executor = MagicMock()
     
     # テスト実行
     service.handle_event({"event_id": "test_event_5", "event": event})
     
     # 検証
-    mock_thread.assert_called_once()
-    mock_thread.return_value.start.assert_called_once()
+    service.executor.submit.assert_called_once_with(service._process_event, "test_event_5", event)
 
 def test_handle_mention(service, mock_slack_client, mock_bedrock_client):
     """メンション処理のテスト"""
@@ -144,22 +254,46 @@ def test_handle_mention(service, mock_slack_client, mock_bedrock_client):
     mock_bedrock_client.generate_response.assert_called_once()
     service._process_response.assert_called_once()
 
+def test_handle_mention_top_level_uses_event(service, mock_slack_client, mock_bedrock_client):
+    """スレッド外メンションでスレッド取得を省略するテスト"""
+    # テストデータ
+    event = {
+        "type": "app_mention",
+        "channel": "C12345",
+        "text": "<@U12345> こんにちは",
+        "ts": "1234567890.123456"
+    }
+    service._process_response = MagicMock()
+
+    # テスト実行
+    service._handle_mention("C12345", "1234567890.123456", event)
+
+    # 検証
+    mock_slack_client.get_thread_messages.assert_not_called()
+    cleaned_messages = mock_bedrock_client.generate_response.call_args[0][0]
+    assert [message["text"] for message in cleaned_messages] == ["こんにちは"]
+    service._process_response.assert_called_once()
+
 def test_handle_direct_message_single(service, mock_slack_client, mock_bedrock_client):
     """単一DMメッセージ処理のテスト"""
     # モックの設定
     mock_bedrock_client.generate_response.return_value = "こんにちは！何かお手伝いできることはありますか？"
+    event = {"type": "message", "channel": "D12345", "text": "こんにちは", "ts": "1234567890.123456"}
     
     # _process_responseをモック化
     service._process_response = MagicMock()
-    service._remove_mention_tags = MagicMock(return_value="こんにちは")
+    service._build_message_text = MagicMock(return_value="こんにちは")
     
     # テスト実行（単一メッセージ）
-    service._handle_direct_message("D12345", "1234567890.123456", True)
+    service._handle_direct_message("D12345", "1234567890.123456", True, event)
     
-    # 検証
-    service._remove_mention_tags.assert_called_once_with("1234567890.123456")
-    mock_bedrock_client.generate_response.assert_called_once()
+    # 検証（イベント自体を使うためスレッドは取得しない）
+    mock_slack_client.get_thread_messages.assert_not_called()
+    service._build_message_text.assert_called_once_with(event)
+    mock_bedrock_client.generate_response.assert_called_once_with("こんにちは")
     service._process_response.assert_called_once()
+    args = service._process_response.call_args[0]
+    assert args[:3] == ("D12345", "1234567890.123456", "こんにちは！何かお手伝いできることはありますか？")
 
 def test_handle_direct_message_thread(service, mock_slack_client, mock_bedrock_client):
     """スレッドDMメッセージ処理のテスト"""
@@ -183,6 +317,44 @@ def test_handle_direct_message_thread(service, mock_slack_client, mock_bedrock_c
     mock_bedrock_client.generate_response.assert_called_once_with(cleaned_messages)
     service._process_response.assert_called_once()
 
+def test_handle_mention_loading_message_not_in_thread(service, mock_slack_client, mock_bedrock_client):
+    """ローディングメッセージがスレッド取得結果に含まれないテスト"""
+    loading_reply = {"text": "処理中です...", "bot_id": "B12345", "ts": "1234567890.999999"}
+    mock_slack_client.send_message.return_value = {"success": True, "ts": loading_reply["ts"]}
+
+    def get_thread_messages(channel, thread_ts):
+        messages = [{"text": "<@U12345> 天気を教えて", "ts": "1234567890.123456"}]
+        # ローディングメッセージが先に投稿されていれば最新のメッセージとして返る
+        if mock_slack_client.send_message.called:
+            messages.append(loading_reply)
+        return messages
+
+    mock_slack_client.get_thread_messages.side_effect = get_thread_messages
+    service._process_response = MagicMock()
+
+    # テスト実行
+    service._handle_mention("C12345", "1234567890.123456", {"thread_ts": "1234567890.123456"})
+
+    # 検証
+    cleaned_messages = mock_bedrock_client.generate_response.call_args[0][0]
+    assert [message["text"] for message in cleaned_messages] == ["天気を教えて"]
+    service._process_response.assert_called_once()
+
+def test_handle_direct_message_thread_error_updates_loading_message(service, mock_slack_client, mock_bedrock_client):
+    """応答生成に失敗した場合にローディングメッセージをエラー表示に置き換えるテスト"""
+    mock_slack_client.get_thread_messages.return_value = [{"text": "こんにちは", "ts": "1234567890.123456"}]
+    mock_slack_client.send_message.return_value = {"success": True, "ts": "1234567890.999999"}
+    mock_bedrock_client.generate_response.side_effect = RuntimeError("boom")
+
+    # テスト実行
+    service._handle_direct_message("D12345", "1234567890.123456", False)
+
+    # 検証
+    mock_slack_client.update_message.assert_called_once()
+    kwargs = mock_slack_client.update_message.call_args.kwargs
+    assert kwargs["ts"] == "1234567890.999999"
+    assert "boom" in kwargs["blocks"][0]["text"]["text"]
+
 def test_clean_messages(service):
     """メッセージクリーニングのテスト"""
     # テストデータ
@@ -203,6 +375,65 @@ def test_clean_messages(service):
     assert result[0]["ts"] == "1234567890.123456"
     assert result[1]["bot_id"] == "B12345"
 
+def test_clean_messages_reuses_cleaned_text(service):
+    """整形済みテキストの再利用のテスト"""
+    messages = [{"text": "<@U12345> こんにちは", "ts": "1234567890.123456"}]
+    service._clean_messages(messages)
+
+    with patch.object(service, "_process_slack_formatting") as mock_format:
+        result = service._clean_messages(messages)
+        # 編集でテキストが変わった場合は整形し直す
+        mock_format.return_value = "こんばんは"
+        edited = service._clean_messages([{"text": "<@U12345> こんばんは", "ts": "1234567890.123456"}])
+
+    # 検証
+    assert result[0]["text"] == "こんにちは"
+    assert edited[0]["text"] == "こんばんは"
+    mock_format.assert_called_once_with("<@U12345> こんばんは")
+
+def test_clean_messages_cache_limited_by_size(service):
+    """整形済みテキストのキャッシュが合計文字数で制限されるテスト"""
+    messages = [{"text": "あ" * 10, "ts": f"1234567890.00000{i}"} for i in range(3)]
+
+    # テスト実行（1件あたり元テキストと整形後テキストで20文字）
+    with patch.object(slack_service_module, "_CLEAN_CACHE_MAX_CHARS", 45):
+        service._clean_messages(messages)
+
+    # 検証
+    assert list(service._clean_cache) == [("1234567890.000001", "あ" * 10), ("1234567890.000002", "あ" * 10)]
+    assert service._clean_cache_chars == 40
+
+def test_clean_messages_caches_user_info(service, mock_slack_client):
+    """ユーザー情報のキャッシュのテスト"""
+    mock_slack_client.get_user_info.return_value = {"success": True, "display_name": "山田"}
+    messages = [
+        {"text": "こんにちは", "user": "U12345", "ts": "1234567890.123456"},
+        {"text": "天気を教えて", "user": "U12345", "ts": "1234567890.123457"}
+    ]
+
+    # テスト実行
+    result = service._clean_messages(messages)
+
+    # 検証
+    assert [message["user_name"] for message in result] == ["山田", "山田"]
+    mock_slack_client.get_user_info.assert_called_once_with("U12345")
+
+def test_clean_messages_multiple_users(service, mock_slack_client):
+    """複数ユーザーのユーザー名取得のテスト"""
+    mock_slack_client.get_user_info.side_effect = lambda user_id: {"success": True, "display_name": f"name-{user_id}"}
+    messages = [
+        {"text": "こんにちは", "user": "U1", "ts": "1234567890.123456"},
+        {"text": "こんばんは", "user": "U2", "ts": "1234567890.123457"},
+        {"text": "天気を教えて", "user": "U1", "ts": "1234567890.123458"}
+    ]
+
+    # テスト実行
+    result = service._clean_messages(messages)
+
+    # 検証
+    assert [message["user_name"] for message in result] == ["name-U1", "name-U2", "name-U1"]
+    assert mock_slack_client.get_user_info.call_count == 2
+
 def test_bedrock_create_conversation_history(service, mock_bedrock_client):
     """BedrockClientの会話履歴作成テスト"""
     # テストデータ
@@ -241,45 +472,140 @@ def test_remove_mention_tags(service):
     # 検証
     assert result == "こんにちは  元気ですか？"
 
-def test_process_response_success(service, mock_slack_client):
+def test_remove_mention_tags_with_urls(service):
+    """表示テキスト付きURLとURLタグの変換のテスト"""
+    # テストデータ
+    text = "<@U12345> 資料は<https://example.com/doc|設計書>と<https://example.com>を参照"
+    
+    # テスト実行
+    result = service._remove_mention_tags(text)
+    
+    # 検証
+    assert result == "資料はhttps://example.com/doc (設計書)とhttps://example.comを参照"
+
+def test_remove_mention_tags_with_bot_user_id(mock_slack_client, mock_bedrock_client):
+    """ボット自身のメンション除去のテスト"""
+    service = SlackService(
+        slack_client=mock_slack_client,
+        bedrock_client=mock_bedrock_client,
+        logger=MagicMock(),
+        bot_user_id="UBOT"
+    )
+
+    # 検証
+    assert service._remove_mention_tags("<@UBOT> こんにちは") == "こんにちは"
+    assert service._remove_mention_tags("<@UBOT> <@U67890> 元気ですか？ <https://example.com>") == "元気ですか？ https://example.com"
+
+def test_process_response_success(service, mock_slack_client, mock_converter):
     """応答処理の成功テスト"""
     # モックの設定
     mock_slack_client.send_message.return_value = {"success": True, "ts": "1234567890.123456"}
     service._update_message_with_response = MagicMock()
-    service.converter.markdown_to_slack_format = MagicMock(return_value="こんにちは！")
+    mock_converter.markdown_to_slack_format.return_value = "こんにちは！"
     
     # テスト実行
     result = service._process_response("C12345", "1234567890.123456", "こんにちは！")
     
     # 検証
     mock_slack_client.send_message.assert_called_once()
-    service.converter.markdown_to_slack_format.assert_called_once_with("こんにちは！")
+    mock_converter.markdown_to_slack_format.assert_called_once_with("こんにちは！")
     service._update_message_with_response.assert_called_once()
     assert result["success"] is True
     assert result["temp_ts"] == "1234567890.123456"
 
-def test_process_response_no_timestamp(service, mock_slack_client):
+def test_process_response_with_loading_future(service, mock_slack_client, mock_converter):
+    """先行送信したローディングメッセージを使う応答処理のテスト"""
+    # モックの設定
+    loading_future = MagicMock()
+    loading_future.result.return_value = {"success": True, "ts": "1234567890.999999"}
+    service._update_message_with_response = MagicMock()
+    mock_converter.markdown_to_slack_format.return_value = "こんにちは！"
+
+    # テスト実行
+    result = service._process_response("C12345", "1234567890.123456", "こんにちは！", loading_future)
+
+    # 検証
+    mock_slack_client.send_message.assert_not_called()
+    service._update_message_with_response.assert_called_once_with("C12345", "1234567890.999999", "こんにちは！")
+    assert result["temp_ts"] == "1234567890.999999"
+
+def test_process_response_no_timestamp(service, mock_slack_client, mock_converter):
     """タイムスタンプなしの応答処理テスト"""
     # モックの設定
     mock_slack_client.send_message.return_value = {"success": False}
     mock_slack_client.send_long_message = MagicMock()
-    service.converter.markdown_to_slack_format = MagicMock(return_value="こんにちは！")
+    mock_converter.markdown_to_slack_format.return_value = "こんにちは！"
     
     # テスト実行
     result = service._process_response("C12345", "1234567890.123456", "こんにちは！")
     
     # 検証
     mock_slack_client.send_message.assert_called_once()
-    service.converter.markdown_to_slack_format.assert_called_once_with("こんにちは！")
+    mock_converter.markdown_to_slack_format.assert_called_once_with("こんにちは！")
     mock_slack_client.send_long_message.assert_called_once()
     assert result["success"] is True
     assert result["temp_ts"] is None
 
-def test_process_response_exception(service, mock_slack_client):
+def test_handle_direct_message_single_fast_response_skips_loading(service, mock_slack_client, mock_converter):
+    """猶予時間内に応答が揃った単一DMでローディングメッセージを送信しないテスト"""
+    # モックの設定
+    mock_converter.markdown_to_slack_format.return_value = "モックレスポンス"
+    event = {"type": "message", "channel": "D12345", "text": "こんにちは", "ts": "1234567890.123456"}
+
+    # テスト実行
+    service._handle_direct_message("D12345", "1234567890.123456", True, event)
+
+    # 検証
+    mock_slack_client.send_message.assert_not_called()
+    mock_slack_client.send_long_message.assert_called_once_with(
+        channel="D12345",
+        text="モックレスポンス",
+        thread_ts="1234567890.123456"
+    )
+
+def test_handle_direct_message_single_slow_response_shows_loading(service, mock_slack_client, mock_bedrock_client, mock_converter):
+    """応答生成が猶予時間を超えた単一DMでローディングメッセージを送信して更新するテスト"""
+    # モックの設定
+    mock_slack_client.send_message.return_value = {"success": True, "ts": "1234567890.999999"}
+    mock_slack_client.update_message.return_value = {"success": True}
+    mock_converter.markdown_to_slack_format.return_value = "モックレスポンス"
+    mock_bedrock_client.generate_response.side_effect = lambda text: time.sleep(0.1) or "モックレスポンス"
+    event = {"type": "message", "channel": "D12345", "text": "こんにちは", "ts": "1234567890.123456"}
+
+    # テスト実行
+    with patch.object(slack_service_module, "_LOADING_GRACE_PERIOD", 0.01):
+        service._handle_direct_message("D12345", "1234567890.123456", True, event)
+
+    # 検証
+    mock_slack_client.send_message.assert_called_once()
+    mock_slack_client.update_message.assert_called_once_with(
+        channel="D12345",
+        ts="1234567890.999999",
+        text="モックレスポンス"
+    )
+    mock_slack_client.send_long_message.assert_not_called()
+
+def test_process_response_empty_response(service, mock_slack_client, mock_converter):
+    """空の応答の処理テスト"""
+    # モックの設定
+    mock_slack_client.send_message.return_value = {"success": True, "ts": "1234567890.123456"}
+    service._update_message_with_response = MagicMock()
+
+    # テスト実行
+    result = service._process_response("C12345", "1234567890.123456", "  \n")
+
+    # 検証
+    mock_converter.markdown_to_slack_format.assert_not_called()
+    service._update_message_with_response.assert_called_once_with(
+        "C12345", "1234567890.123456", "（応答を生成できませんでした）"
+    )
+    assert result["success"] is True
+
+def test_process_response_exception(service, mock_slack_client, mock_converter):
     """応答処理の例外テスト"""
     # モックの設定
     mock_slack_client.send_message.return_value = {"success": True, "ts": "1234567890.123456"}
-    service.converter.markdown_to_slack_format = MagicMock(side_effect=Exception("テストエラー"))
+    mock_converter.markdown_to_slack_format.side_effect = Exception("テストエラー")
     service._handle_response_error = MagicMock()
     
     # テスト実行
@@ -287,7 +613,7 @@ def test_process_response_exception(service, mock_slack_client):
     
     # 検証
     mock_slack_client.send_message.assert_called_once()
-    service.converter.markdown_to_slack_format.assert_called_once_with("こんにちは！")
+    mock_converter.markdown_to_slack_format.assert_called_once_with("こんにちは！")
     service._handle_response_error.assert_called_once()
     assert result["success"] is False
     assert "テストエラー" in result["error"]
@@ -113,6 +113,20 @@ class TestBedrockClientInit:
             assert result == "You are a helpful AI assistant. Speak in Japanese"
             bedrock_client.logger.warning.assert_called_once()
 
+    def test_get_system_prompt_cached(self, bedrock_client):
+        """システムプロンプトのキャッシュのテスト"""
+        with patch('src.infrastructure.bedrock_client.os.stat') as mock_stat:
+            mock_stat.return_value.st_mtime_ns = 1
+            with patch.object(bedrock_client, '_load_system_prompt', return_value="プロンプト") as mock_load:
+                assert bedrock_client._get_system_prompt() == "プロンプト"
+                assert bedrock_client._get_system_prompt() == "プロンプト"
+                mock_load.assert_called_once()
+
+                # ファイルが更新された場合は読み込み直す
+                mock_stat.return_value.st_mtime_ns = 2
+                bedrock_client._get_system_prompt()
+                assert mock_load.call_count == 2
+
 
 class TestBedrockClientMCP:
     """MCPサーバー関連のテスト"""
@@ -203,6 +217,15 @@ class TestBedrockClientMCP:
         mock_client2.cleanup.assert_called_once()
         assert bedrock_client.mcp_clients == {}
     
+    def test_close_without_mcp_clients(self, bedrock_client):
+        """MCP未初期化のまま終了してもイベントループを起動しないテスト"""
+        with patch.object(bedrock_client, '_get_or_create_event_loop') as mock_get_loop:
+            bedrock_client.close()
+        
+        # 検証
+        mock_get_loop.assert_not_called()
+        assert bedrock_client._loop is None
+    
     @pytest.mark.asyncio
     async def test_cleanup_mcp_clients_error(self, bedrock_client):
         """MCPクライアントクリーンアップエラーのテスト"""
@@ -292,7 +315,22 @@ class TestBedrockClientConversation:
         assert result[1]["content"][0]["text"] == "お元気ですか？"
         assert result[2]["role"] == "user"
         assert result[2]["content"][0]["text"] == "はい、元気です"
-    
+
+    def test_create_conversation_history_dedups_consecutive_messages(self, bedrock_client):
+        """連続した同一メッセージの重複排除のテスト"""
+        messages = [
+            {"text": "こんにちは", "ts": "1234567890.123456"},
+            {"text": "こんにちは", "ts": "1234567890.123457"},
+            {"text": "お元気ですか？", "bot_id": "B12345", "ts": "1234567890.123458"},
+            {"text": "こんにちは", "ts": "1234567890.123459"}
+        ]
+
+        result = bedrock_client.create_conversation_history_from_messages(messages)
+
+        # 検証（連続していない同一メッセージは残る）
+        assert [entry["content"][0]["text"] for entry in result] == ["こんにちは", "お元気ですか？", "こんにちは"]
+        assert [entry["role"] for entry in result] == ["user", "assistant", "user"]
+
     def test_convert_conversation_to_text(self, bedrock_client):
         """会話履歴テキスト変換のテスト"""
         conversation = [
@@ -321,6 +359,39 @@ class TestBedrockClientConversation:
         expected = "User: ありがとう\n\n参考情報：\nUser: こんにちは\n今日の天気は？\n\nAssistant: 晴れです"
         assert result == expected
     
+    def test_convert_conversation_to_text_truncates_references(self, bedrock_client):
+        """参考情報が上限を超える場合に中間のメッセージを省くテスト"""
+        conversation = [
+            {"role": "user", "content": [{"text": "最初"}]},
+            {"role": "assistant", "content": [{"text": "古い回答"}]},
+            {"role": "user", "content": [{"text": "直近"}]},
+            {"role": "user", "content": [{"text": "質問"}]}
+        ]
+        
+        with patch('src.infrastructure.bedrock_client.MAX_INPUT_CHARS', 36):
+            result = bedrock_client._convert_conversation_to_text(conversation)
+        
+        # 検証
+        expected = "User: 質問\n\n参考情報：\nUser: 最初\n\nUser: 直近"
+        assert result == expected
+        assert len(result) <= 36
+    
+    def test_convert_conversation_to_text_truncates_oversized_head(self, bedrock_client):
+        """スレッド冒頭のメッセージが長すぎる場合に切り詰めて直近のメッセージを残すテスト"""
+        conversation = [
+            {"role": "user", "content": [{"text": "あ" * 50}]},
+            {"role": "user", "content": [{"text": "直近"}]},
+            {"role": "user", "content": [{"text": "質問"}]}
+        ]
+        
+        with patch('src.infrastructure.bedrock_client.MAX_INPUT_CHARS', 46):
+            result = bedrock_client._convert_conversation_to_text(conversation)
+        
+        # 検証
+        expected = "User: 質問\n\n参考情報：\nUser: ああああああ...\n\nUser: 直近"
+        assert result == expected
+        assert len(result) <= 46
+    
     def test_convert_conversation_to_text_single_message(self, bedrock_client):
         """単一メッセージの会話履歴テキスト変換のテスト"""
         conversation = [
@@ -143,3 +143,33 @@ class TestCustomMCPStdio:
         # 検証
         assert len(custom_mcp.function_schema["functions"]) == 1
         assert custom_mcp.function_schema["functions"][0]["name"] == "tool2"
+    
+    @pytest.mark.asyncio
+    async def test_set_callable_tool_from_other_loop(self, custom_mcp_stdio):
+        """別スレッドのイベントループからのツール呼び出しがセッションのループで実行されるテスト"""
+        # ツールリストのモック
+        mock_tool = MagicMock()
+        mock_tool.name = "test_tool"
+        mock_list_tools = MagicMock()
+        mock_list_tools.tools = [mock_tool]
+        custom_mcp_stdio.session.list_tools = AsyncMock(return_value=mock_list_tools)
+        
+        # call_toolが実行されたループを記録
+        session_loop = asyncio.get_running_loop()
+        called_loops = []
+        async def call_tool(tool_name, arguments):
+            called_loops.append(asyncio.get_running_loop())
+            mock_content = MagicMock()
+            mock_content.text = "成功結果"
+            return MagicMock(content=[mock_content])
+        custom_mcp_stdio.session.call_tool = call_tool
+        
+        await custom_mcp_stdio.set_callable_tool(set())
+        
+        # 別スレッドの新しいループから呼び出す
+        tool = custom_mcp_stdio.callable_tools["test_tool"]
+        result = await asyncio.to_thread(lambda: asyncio.run(tool(param="value")))
+        
+        # 検証
+        assert result == "成功結果"
+        assert called_loops == [session_loop]
@@ -2,7 +2,7 @@ import json
 import time
 import pytest
 from unittest.mock import patch, MagicMock
-from bottle import response
+from bottle import BaseRequest, response
 
 def test_index_endpoint(test_client):
     """ルートエンドポイントのテスト"""
@@ -107,3 +107,56 @@ def test_error_handlers(mock_verifier, test_client, mock_slack_service):
     assert resp.status_code == 400  # APIでは例外をキャッチして400を返す
     assert resp.json['status'] == 'error'
     assert resp.json['message'] == 'Test error'
+
+@patch('src.presentation.slack_controller.signature_verifier')
+def test_slack_events_body_too_large(mock_verifier, test_client, slack_event_message, mock_slack_service):
+    """上限を超えるリクエストボディを読み込まずに拒否するテスト"""
+    headers = {
+        'X-Slack-Request-Timestamp': str(int(time.time())),
+        'X-Slack-Signature': 'v0=dummy_signature'
+    }
+    
+    with patch.object(BaseRequest, 'MEMFILE_MAX', 16):
+        resp = test_client.post_json(
+            '/default/slack-subscriptions',
+            slack_event_message,
+            headers=headers,
+            expect_errors=True
+        )
+    
+    assert resp.status_code == 413
+    assert resp.json['message'] == 'Request entity too large'
+    mock_verifier.is_valid.assert_not_called()
+    mock_slack_service.handle_event.assert_not_called()
+
+@patch('src.presentation.slack_controller.signature_verifier')
+def test_slack_events_chunked_body_rejected(mock_verifier, test_client, slack_event_message, mock_slack_service):
+    """Content-Lengthのないチャンク転送のリクエストを読み込まずに拒否するテスト"""
+    from webtest import TestRequest
+    
+    req = TestRequest.blank(
+        '/default/slack-subscriptions',
+        method='POST',
+        body=json.dumps(slack_event_message).encode(),
+        headers={
+            'X-Slack-Request-Timestamp': str(int(time.time())),
+            'X-Slack-Signature': 'v0=dummy_signature',
+            'Transfer-Encoding': 'chunked'
+        }
+    )
+    req.environ.pop('CONTENT_LENGTH', None)
+    
+    resp = test_client.do_request(req, status=None, expect_errors=True)
+    
+    assert resp.status_code == 411
+    assert resp.json['message'] == 'Length required'
+    mock_verifier.is_valid.assert_not_called()
+    mock_slack_service.handle_event.assert_not_called()
+
+def test_cors_headers(test_client):
+    """CORSヘッダーのテスト（Originヘッダーがある場合のみ付与）"""
+    resp = test_client.get('/', headers={'Origin': 'https://example.com'})
+    assert resp.headers['Access-Control-Allow-Origin'] == '*'
+
+    resp = test_client.get('/')
+    assert 'Access-Control-Allow-Origin' not in resp.headers